@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 import argparse
 import os
-import platform
-import shlex
-import subprocess
 import sys
 from collections import defaultdict
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import groupby
+from operator import itemgetter
 
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn
+from rich.progress import BarColumn, Progress, TextColumn, TimeRemainingColumn
 from rich.table import Table
 
+from dropfix._core import (
+    _CHECK_FNS,
+    _SYSTEM,
+    _check_linux,
+    _scan_parallel,
+    _supports_ignore_marker,
+    find_dropbox_path,
+)
 from dropfix._formatter import RichHelpFormatter, show_version
 from dropfix._logger import logger, set_verbosity
 
@@ -38,12 +45,26 @@ def main():
         default=[".venv", ".conda", "node_modules"],
         help="Directories to check (default: .venv .conda node_modules)",
     )
+    parser.add_argument(
+        "--exclude",
+        nargs="+",
+        default=[".git", ".svn", "__pycache__", ".cache", ".Trash"],
+        help="Directory names to skip descending into; target names are never skipped",
+    )
+    parser.add_argument(
+        "--no-prune-hidden",
+        action="store_true",
+        help="Also search inside hidden directories (slower)",
+    )
     parser.add_argument(
         "--show",
         choices=["all", "ignored", "not-ignored"],
         default="all",
         help="Filter results (default: all)",
     )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Scanner threads for the directory walk (default: auto)"
+    )
     parser.add_argument(
         "-v", "--verbose", action="count", default=0, help="Increase verbosity (use -v, -vv for more)"
     )
@@ -52,6 +73,9 @@ def main():
     # Set logging verbosity
     set_verbosity(args.verbose)
 
+    # Each CLI invocation re-detects the root; the cache only spans one run
+    find_dropbox_path.cache_clear()
+
     # Handle help and version
     if args.help:
         parser.print_help()
@@ -82,81 +106,47 @@ def main():
     console.print(Panel(table, title="[bold cyan]Check Configuration[/bold cyan]", border_style="cyan"))
 
     # Check directories
-    check_directories(dropbox_path, args.dirs, args.show)
+    check_directories(
+        dropbox_path,
+        args.dirs,
+        args.show,
+        prune_hidden=not args.no_prune_hidden,
+        exclude=frozenset(args.exclude),
+        max_workers=args.workers,
+    )
     return 0
 
 
-def find_dropbox_path():
-    """Auto-detect Dropbox path based on common locations"""
-    home = Path.home()
-    common_paths = [home / "Dropbox", home / "Documents" / "Dropbox"]
-
-    # Windows-specific paths
-    if platform.system() == "Windows":
-        common_paths.extend([
-            Path(os.environ.get("USERPROFILE", "")) / "Dropbox",
-            Path(os.environ.get("HOMEDRIVE", "") + os.environ.get("HOMEPATH", "")) / "Dropbox",
-        ])
-
-    for path in common_paths:
-        if path.exists() and path.is_dir():
-            return path
-
-    return None
-
-
-def check_directories(dropbox_path, dir_names, show_filter="all"):
+def check_directories(dropbox_path, dir_names, show_filter="all", prune_hidden=True, exclude=None, max_workers=None):
     """Find directories and check if they're ignored by Dropbox"""
-    system = platform.system()
     ignored_count = 0
     not_ignored_count = 0
     error_count = 0
 
-    logger.info(f"Checking directories: {dir_names}")
-    logger.debug(f"System: {system}, Filter: {show_filter}")
-
-    # Track directories by name for grouping
-    dir_groups = {name: [] for name in dir_names}
-
-    # Find all matching directories
-    for dir_name in dir_names:
-        console.print(f"[cyan]Searching for '{dir_name}' directories...[/cyan]")
-        logger.debug(f"Searching for '{dir_name}' in {dropbox_path}")
-        matches = []
-
-        try:
-            # Use os.walk to find all matching directories
-            for root, dirs, _ in os.walk(dropbox_path):
-                for d in dirs:
-                    if d == dir_name:
-                        matches.append(Path(root) / d)
-        except (PermissionError, OSError) as e:
-            console.print(f"[red]Error accessing directory: {e}[/red]")
-            continue
-
-        if not matches:
-            console.print(f"[dim]No '{dir_name}' directories found.[/dim]")
-            continue
-
-        console.print(f"[green]Found {len(matches)} '{dir_name}' directories.[/green]")
-        logger.info(f"Found {len(matches)} '{dir_name}' directories")
-        dir_groups[dir_name].extend(matches)
-
-    # Combine all directories for processing
-    all_matches = []
-    for matches in dir_groups.values():
-        all_matches.extend(matches)
-
-    if not all_matches:
-        console.print("[dim]No matching directories found.[/dim]")
+    # %-style args keep formatting lazy: the cost is only paid when the
+    # level is enabled, which matters in the per-directory loop below
+    logger.info("Checking directories: %s", dir_names)
+    logger.debug("System: %s, Filter: %s", _SYSTEM, show_filter)
+
+    # One doomed check per directory is thousands of doomed checks; probe
+    # the root's filesystem once and bail out with a clear message instead
+    if not _supports_ignore_marker(dropbox_path):
+        logger.warning("Filesystem at %s does not support ignore markers", dropbox_path)
+        console.print(
+            f"[red]The filesystem at {dropbox_path} does not support "
+            "Dropbox ignore attributes; skipping checks.[/red]"
+        )
         return
 
-    console.print(f"[cyan]Checking Dropbox ignore status for {len(all_matches)} directories...[/cyan]")
+    console.print(f"[cyan]Searching for {', '.join(dir_names)} directories...[/cyan]")
+    logger.debug("Searching for %s in %s", dir_names, dropbox_path)
 
     # Check each directory
     ignored_dirs = []
     not_ignored_dirs = []
     error_dirs = []
+    error_messages = []
+    found_counts = defaultdict(int)
 
     with Progress(
         TextColumn("[cyan]{task.description}[/cyan]"),
@@ -164,35 +154,93 @@ def check_directories(dropbox_path, dir_names, show_filter="all"):
         TextColumn("[white]{task.completed}/{task.total}[/white]"),
         TimeRemainingColumn(),
         console=console,
+        refresh_per_second=10,
     ) as progress:
-        task = progress.add_task("Checking directories", total=len(all_matches))
-        for dir_path in all_matches:
+        # total is unknown until the walk finishes; Rich shows a pulsing
+        # bar for total=None, then we pin it once all checks are queued
+        task = progress.add_task("Checking directories", total=None)
+        # Bind the per-OS check once; each path then costs one function
+        # call instead of re-dispatching on the platform string
+        check_fn = _CHECK_FNS.get(_SYSTEM, _check_linux)
+
+        def guarded_check(dir_path):
+            try:
+                return check_fn(dir_path)
+            except (PermissionError, OSError) as e:
+                logger.error("Error checking %s: %s", dir_path, e)
+                # Printing through a live Progress forces a re-render;
+                # collect the messages and emit them after the bar closes
+                error_messages.append(f"[red]Error checking {dir_path}: {e}[/red]")
+                return None  # could not determine
+
+        # Aliased paths (symlinks, overlapping targets) resolve to the same
+        # inode — cache by (st_dev, st_ino) so each directory is checked once
+        check_cache = {}
+
+        def cached_check(dir_path):
             try:
-                logger.debug(f"Checking: {dir_path}")
-                is_ignored = check_if_ignored(dir_path, system)
+                st = os.stat(dir_path)
+                key = (st.st_dev, st.st_ino)
+            except OSError:
+                return guarded_check(dir_path)
+            if key in check_cache:
+                return check_cache[key]
+            result = guarded_check(dir_path)
+            check_cache[key] = result
+            return result
+
+        # Each check waits on the filesystem, so threads give near-linear speedup.
+        # Cap workers low on macOS where APFS degrades under heavy parallelism.
+        check_workers = 4 if _SYSTEM == "Darwin" else min(32, (os.cpu_count() or 4) * 4)
+        with ThreadPoolExecutor(max_workers=check_workers) as executor:
+            # Stream matches straight into the pool so xattr checks overlap
+            # the directory walk instead of waiting for a full match list
+            futures = {}
+            for match in _scan_parallel(
+                dropbox_path, frozenset(dir_names), prune_hidden=prune_hidden, exclude=exclude, max_workers=max_workers
+            ):
+                found_counts[os.path.basename(match)] += 1
+                futures[executor.submit(cached_check, match)] = match
+            progress.update(task, total=len(futures))
+            # Advance the bar in chunks: each advance() call does locked
+            # bookkeeping, and at 10 Hz nobody sees sub-chunk granularity
+            pending_advance = 0
+            for future in as_completed(futures):
+                dir_path = futures[future]
+                logger.debug("Checking: %s", dir_path)
+                is_ignored = future.result()
                 if is_ignored is True:
-                    logger.debug(f"Ignored: {dir_path}")
+                    logger.debug("Ignored: %s", dir_path)
                     ignored_dirs.append(dir_path)
                     ignored_count += 1
                 elif is_ignored is False:
-                    logger.debug(f"Not ignored: {dir_path}")
+                    logger.debug("Not ignored: %s", dir_path)
                     not_ignored_dirs.append(dir_path)
                     not_ignored_count += 1
-                else:  # None = error
-                    logger.warning(f"Error checking: {dir_path}")
+                else:  # None = error; guarded_check already logged the reason
                     error_dirs.append(dir_path)
                     error_count += 1
-            except (PermissionError, OSError, subprocess.CalledProcessError) as e:
-                logger.error(f"Error checking {dir_path}: {e}")
-                console.print(f"[red]Error checking {dir_path}: {e}[/red]")
-                error_dirs.append(dir_path)
-                error_count += 1
-            progress.advance(task)
-
-    # Group ignored directories by name and parent-child relationships
-    ignored_by_name = defaultdict(list)
-    for d in ignored_dirs:
-        ignored_by_name[d.name].append(d)
+                pending_advance += 1
+                if pending_advance == 64:
+                    progress.advance(task, pending_advance)
+                    pending_advance = 0
+            if pending_advance:
+                progress.advance(task, pending_advance)
+
+    for message in error_messages:
+        console.print(message)
+
+    if ignored_count + not_ignored_count + error_count == 0:
+        console.print("[dim]No matching directories found.[/dim]")
+        return
+
+    for dir_name in dir_names:
+        count = found_counts[dir_name]
+        if count:
+            console.print(f"[green]Found {count} '{dir_name}' directories.[/green]")
+            logger.info("Found %d '%s' directories", count, dir_name)
+        else:
+            console.print(f"[dim]No '{dir_name}' directories found.[/dim]")
 
     # Print results
     console.print()
@@ -204,9 +252,11 @@ def check_directories(dropbox_path, dir_names, show_filter="all"):
             border_style="green"
         ))
 
-        for dir_name, paths in ignored_by_name.items():
+        # Group by name: basenames are computed once for the sort and the
+        # sorted groups come out in stable alphabetical order
+        for _name, group in groupby(_name_pairs(ignored_dirs), key=itemgetter(0)):
             # Get organized hierarchy of directories
-            top_level_dirs, nested_counts = organize_directories(paths, dropbox_path)
+            top_level_dirs, nested_counts = organize_directories([d for _, d in group], dropbox_path)
 
             # Show only top-level directories with nested counts
             for top_dir in top_level_dirs:
@@ -223,14 +273,9 @@ def check_directories(dropbox_path, dir_names, show_filter="all"):
             border_style="cyan"
         ))
 
-        # Group not-ignored directories by name
-        not_ignored_by_name = defaultdict(list)
-        for d in not_ignored_dirs:
-            not_ignored_by_name[d.name].append(d)
-
-        for dir_name, paths in not_ignored_by_name.items():
+        for _name, group in groupby(_name_pairs(not_ignored_dirs), key=itemgetter(0)):
             # Get organized hierarchy
-            top_level_dirs, nested_counts = organize_directories(paths, dropbox_path)
+            top_level_dirs, nested_counts = organize_directories([d for _, d in group], dropbox_path)
 
             # Show only top-level directories with nested counts
             for top_dir in top_level_dirs:
@@ -247,14 +292,9 @@ def check_directories(dropbox_path, dir_names, show_filter="all"):
             border_style="red"
         ))
 
-        # Group error directories by name
-        error_by_name = defaultdict(list)
-        for d in error_dirs:
-            error_by_name[d.name].append(d)
-
-        for dir_name, paths in error_by_name.items():
+        for _name, group in groupby(_name_pairs(error_dirs), key=itemgetter(0)):
             # Get organized hierarchy
-            top_level_dirs, nested_counts = organize_directories(paths, dropbox_path)
+            top_level_dirs, nested_counts = organize_directories([d for _, d in group], dropbox_path)
 
             # Show only top-level directories with nested counts
             for top_dir in top_level_dirs:
@@ -276,11 +316,16 @@ def check_directories(dropbox_path, dir_names, show_filter="all"):
     console.print(Panel(summary_table, title="[bold cyan]Summary[/bold cyan]", border_style="cyan"))
 
 
+def _name_pairs(paths):
+    """Sort paths into (basename, path) pairs ready for groupby"""
+    return sorted(((os.path.basename(p), p) for p in paths), key=itemgetter(0))
+
+
 def organize_directories(paths, base_path):
     """Organize directories into a hierarchy of parent-child relationships
 
     Args:
-        paths: List of Path objects to organize
+        paths: List of paths (str, or anything str() turns into one) to organize
         base_path: Base path to consider as root for relative paths
 
     Returns:
@@ -288,86 +333,30 @@ def organize_directories(paths, base_path):
             - top_level_dirs: List of top-level directories
             - nested_counts: Dict mapping top-level dirs to count of nested dirs
     """
-    # Sort paths by depth (shortest paths first)
-    sorted_paths = sorted(paths, key=lambda p: len(str(p).split(os.sep)))
+    # Sorting by path components puts every directory immediately after its
+    # ancestors, so one pass with the current top-level ancestor classifies
+    # each path — no rescan of all accepted top-level dirs per path.
+    # Stringify each path once up front; the loop itself allocates nothing.
+    path_pairs = sorted(((str(p), p) for p in paths), key=lambda pair: pair[0].split(os.sep))
 
-    # Find top-level directories and count nested directories
     top_level_dirs = []
     nested_counts = {}
-
-    for path in sorted_paths:
-        # Check if this path is under any already processed path
-        is_nested = False
-        path_str = str(path)
-
-        for existing_path in top_level_dirs:
-            existing_str = str(existing_path)
-            # If this path starts with an existing path plus a separator, it's nested
-            if path_str.startswith(existing_str + os.sep):
-                is_nested = True
-                # Increment the nested count for the parent path
-                nested_counts[existing_path] += 1
-                break
-
-        if not is_nested:
-            # This is a top-level directory
+    current_prefix = None  # current top-level path string, os.sep-suffixed
+    current_path = None
+
+    for path_str, path in path_pairs:
+        if current_prefix is not None and path_str.startswith(current_prefix):
+            # Nested under the current top-level directory
+            nested_counts[current_path] += 1
+        else:
+            # This is a new top-level directory
             top_level_dirs.append(path)
             nested_counts[path] = 0
+            current_prefix = path_str + os.sep
+            current_path = path
 
     return top_level_dirs, nested_counts
 
 
-def check_if_ignored(path, system):
-    """Check if a directory is ignored by Dropbox
-
-    Returns:
-        True: Directory is ignored
-        False: Directory is not ignored
-        None: Could not determine (error)
-    """
-    try:
-        if system == "Windows":
-            # Windows: Check NTFS alternate data streams
-            result = subprocess.run(
-                [
-                    "powershell",
-                    "-Command",
-                    f"Get-Content -Path {shlex.quote(str(path))} -Stream com.dropbox.ignored -ErrorAction SilentlyContinue",
-                ],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            # If command succeeds and value is "1", directory is ignored
-            return result.returncode == 0 and result.stdout.strip() == "1"
-
-        elif system == "Darwin":  # macOS
-            # macOS: Check extended attributes
-            result = subprocess.run(
-                ["xattr", "-p", "com.dropbox.ignored", str(path)],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            # If command succeeds and value is "1", directory is ignored
-            return result.returncode == 0 and result.stdout.strip() == "1"
-
-        else:  # Linux and others
-            # Linux: Check attributes
-            result = subprocess.run(
-                ["attr", "-q", "-g", "com.dropbox.ignored", str(path)],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            # If command succeeds and value contains "1", directory is ignored
-            return result.returncode == 0 and "1" in result.stdout.strip()
-
-    except (PermissionError, OSError, subprocess.SubprocessError):
-        return None  # Error occurred
-
-    return False  # Default: not ignored
-
-
 if __name__ == "__main__":
     sys.exit(main())
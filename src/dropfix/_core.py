@@ -0,0 +1,352 @@
+"""Shared filesystem helpers for the dropfix commands"""
+import ctypes
+import errno
+import functools
+import os
+import platform
+import queue
+import stat
+import threading
+from pathlib import Path
+
+from dropfix._logger import logger
+
+# The platform never changes mid-run; resolve it once at import
+_SYSTEM = platform.system()
+
+
+# Well-known large-and-irrelevant directories that are never worth
+# descending into; target names always win over this list
+_DEFAULT_EXCLUDES = frozenset({".git", ".svn", "__pycache__", ".cache", ".Trash"})
+
+
+def _scan_dir(path, targets, prune_hidden, exclude):
+    """Scan one directory level for target names
+
+    Uses os.scandir so directory-ness comes from the cached d_type returned
+    by the kernel (no extra stat per entry). Matched directories are not
+    offered for descent.
+
+    Returns:
+        tuple: (matches, subdirs)
+            - matches: list of matched directory paths (str)
+            - subdirs: list of ((st_dev, st_ino), path) for directories
+              to descend into
+    """
+    matches = []
+    subdirs = []
+    # The except must cover the iteration too: readdir itself can fail
+    # mid-listing (stale NFS handle, I/O error on a syncing mount), not
+    # just the opening scandir call
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                except OSError:
+                    continue
+                if entry.name in targets:
+                    matches.append(entry.path)
+                elif entry.name in exclude or (prune_hidden and entry.name.startswith(".")):
+                    continue
+                else:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    subdirs.append(((st.st_dev, st.st_ino), entry.path))
+    except (PermissionError, OSError) as e:
+        logger.warning("Skipping unreadable directory %s: %s", path, e)
+    return matches, subdirs
+
+
+def _scan(path, targets, prune_hidden=True, exclude=None):
+    """Scan for target directory names in a single serial pass
+
+    Yields matched directory paths (str). A (st_dev, st_ino) visited set
+    guards against revisiting subtrees that are reachable twice (macOS
+    firmlinks, bind mounts, loops).
+
+    Args:
+        path: Directory to scan
+        targets: frozenset of directory names to match
+        prune_hidden: Skip descent into non-target dot-directories
+            (e.g. .git), which are typically huge and never contain targets
+        exclude: Directory names to never descend into (defaults to
+            _DEFAULT_EXCLUDES); a name in both targets and exclude is
+            still matched — targets are checked first
+    """
+    if exclude is None:
+        exclude = _DEFAULT_EXCLUDES
+    visited = set()
+    stack = [os.fspath(path)]
+    while stack:
+        matches, subdirs = _scan_dir(stack.pop(), targets, prune_hidden, exclude)
+        yield from matches
+        for key, subdir in subdirs:
+            if key not in visited:
+                visited.add(key)
+                stack.append(subdir)
+
+
+def _scan_parallel(path, targets, prune_hidden=True, exclude=None, max_workers=None):
+    """Parallel variant of _scan backed by a pool of scanner threads
+
+    Directory listing blocks on the kernel (and on Dropbox's own sync
+    layer), and the GIL is released during scandir, so keeping several
+    listings in flight hides most of that latency. Workers pull pending
+    directories from a shared queue and push subdirectories back; matches
+    are yielded in completion order, which callers must not rely on.
+    """
+    if exclude is None:
+        exclude = _DEFAULT_EXCLUDES
+    if max_workers is None:
+        max_workers = min(8, (os.cpu_count() or 1) * 2)
+    else:
+        # Zero workers would leave the consumer waiting forever and
+        # negative counts blow up in threading; one worker is the floor
+        max_workers = max(1, max_workers)
+    pending = queue.Queue()  # directories awaiting a scan; None stops a worker
+    results = queue.Queue()  # matched paths; None signals walk complete
+    visited = set()
+    lock = threading.Lock()
+    outstanding = 1  # queued-but-unfinished directories, starting with the root
+    pending.put(os.fspath(path))
+
+    def worker():
+        nonlocal outstanding
+        while True:
+            directory = pending.get()
+            if directory is None:
+                return
+            matches, subdirs = [], []
+            try:
+                matches, subdirs = _scan_dir(directory, targets, prune_hidden, exclude)
+            except Exception:  # noqa: BLE001 - a dying worker would hang the walk
+                logger.exception("Unexpected error scanning %s", directory)
+            finally:
+                # The bookkeeping must run no matter what, or the consumer
+                # would block on results.get() forever
+                for match in matches:
+                    results.put(match)
+                with lock:
+                    for key, subdir in subdirs:
+                        if key not in visited:
+                            visited.add(key)
+                            outstanding += 1
+                            pending.put(subdir)
+                    outstanding -= 1
+                    if outstanding == 0:
+                        results.put(None)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max_workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            match = results.get()
+            if match is None:
+                break
+            yield match
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+
+@functools.cache
+def find_dropbox_path():
+    """Auto-detect Dropbox path based on common locations
+
+    The result is cached for the lifetime of the process — the Dropbox
+    root does not move during a run, and both commands may probe it.
+    """
+    home = Path.home()
+    common_paths = [home / "Dropbox", home / "Documents" / "Dropbox"]
+
+    # Windows-specific paths
+    if _SYSTEM == "Windows":
+        common_paths.extend([
+            Path(os.environ.get("USERPROFILE", "")) / "Dropbox",
+            Path(os.environ.get("HOMEDRIVE", "") + os.environ.get("HOMEPATH", "")) / "Dropbox",
+        ])
+
+    logger.debug("Searching for Dropbox in: %s", common_paths)
+    for path in common_paths:
+        # One stat per candidate; exists() + is_dir() would issue two
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            logger.info("Found Dropbox at: %s", path)
+            return path
+
+    logger.warning("Dropbox path not found in common locations")
+    return None
+
+
+# getxattr(2) errno for a missing attribute on macOS (ENOATTR)
+_ENOATTR = 93
+
+# macOS has no os.getxattr, so getxattr(2) is reached through libc
+_libc = ctypes.CDLL(None, use_errno=True) if _SYSTEM == "Darwin" else None
+
+
+def _darwin_getxattr(path_str, name=b"com.dropbox.ignored"):
+    """Read an extended attribute via libc getxattr(2) on macOS
+
+    Returns the attribute value as bytes, or None when the attribute is
+    absent. Raises OSError on other failures.
+    """
+    buf = ctypes.create_string_buffer(64)
+    size = _libc.getxattr(os.fsencode(path_str), name, buf, len(buf), 0, 0)
+    if size < 0:
+        err = ctypes.get_errno()
+        if err == _ENOATTR:
+            return None
+        raise OSError(err, os.strerror(err), path_str)
+    return buf.raw[:size]
+
+
+def _darwin_setxattr(path_str, name=b"com.dropbox.ignored", value=b"1"):
+    """Write an extended attribute via libc setxattr(2) on macOS
+
+    Raises OSError on failure.
+    """
+    rc = _libc.setxattr(os.fsencode(path_str), name, value, len(value), 0, 0)
+    if rc < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), path_str)
+
+
+def _check_windows(path_str):
+    # NTFS alternate data streams: CPython passes the :stream suffix
+    # straight through to CreateFileW
+    try:
+        with open(f"{path_str}:com.dropbox.ignored", "rb") as stream:
+            return stream.read().strip() == b"1"
+    except FileNotFoundError:
+        return False
+
+
+def _check_darwin(path_str):
+    # macOS: extended attributes
+    value = _darwin_getxattr(path_str)
+    return value is not None and value.strip() == b"1"
+
+
+def _check_linux(path_str):
+    # Linux xattrs require the user. namespace prefix
+    try:
+        value = os.getxattr(path_str, b"user.com.dropbox.ignored")
+    except OSError as e:
+        if e.errno == errno.ENODATA:
+            return False  # attribute absent: not ignored
+        raise
+    return value.strip() == b"1"
+
+
+_CHECK_FNS = {"Windows": _check_windows, "Darwin": _check_darwin, "Linux": _check_linux}
+
+
+def check_if_ignored(path, system=_SYSTEM):
+    """Check if a directory is ignored by Dropbox
+
+    Reads the com.dropbox.ignored marker directly (getxattr on Linux/macOS,
+    the NTFS alternate data stream on Windows) instead of spawning a
+    subprocess per directory. Hot loops can look the per-OS function up in
+    _CHECK_FNS once instead of re-dispatching per path.
+
+    Returns:
+        True: Directory is ignored
+        False: Directory is not ignored
+        None: Could not determine (error)
+    """
+    fn = _CHECK_FNS.get(system, _check_linux)
+    try:
+        return fn(str(path))
+    except (PermissionError, OSError):
+        return None  # Error occurred
+
+
+# Marker support per filesystem, keyed by st_dev — a tree spanning
+# several mounts probes each mount once
+_XATTR_SUPPORT = {}
+
+
+def _supports_ignore_marker(path, system=_SYSTEM):
+    """Probe whether the filesystem under path can hold the ignore marker
+
+    A FAT volume or network mount rejects every xattr/stream call the same
+    way (ENOTSUP, or EINVAL for NTFS stream syntax), so one probe per
+    device lets callers skip thousands of doomed checks. Errors that do
+    not identify a marker-less filesystem count as supported; the
+    per-directory checks will surface them individually.
+    """
+    path_str = str(path)
+    try:
+        key = os.stat(path_str).st_dev
+    except OSError:
+        return True
+    if key not in _XATTR_SUPPORT:
+        supported = True
+        try:
+            if system == "Windows":
+                try:
+                    with open(f"{path_str}:com.dropbox.ignored", "rb"):
+                        pass
+                except FileNotFoundError:
+                    pass  # NTFS parsed the stream name; the marker is just absent
+                except OSError as e:
+                    supported = e.errno != errno.EINVAL  # FAT rejects stream syntax
+            elif system == "Darwin":
+                _darwin_getxattr(path_str)
+            else:
+                try:
+                    os.getxattr(path_str, b"user.com.dropbox.ignored")
+                except OSError as e:
+                    if e.errno != errno.ENODATA:
+                        raise
+        except OSError as e:
+            supported = e.errno != errno.ENOTSUP
+        _XATTR_SUPPORT[key] = supported
+    return _XATTR_SUPPORT[key]
+
+
+def _ignore_windows(path_str):
+    # Windows: write the NTFS alternate data stream directly — CPython
+    # passes the :stream suffix through to CreateFileW, mirroring the read
+    # side in check_if_ignored, so no PowerShell process is ever spawned
+    with open(f"{path_str}:com.dropbox.ignored", "wb") as stream:
+        stream.write(b"1")
+
+
+def _ignore_darwin(path_str):
+    # macOS: extended attributes, written via setxattr(2) directly
+    _darwin_setxattr(path_str)
+
+
+def _ignore_linux(path_str):
+    # Linux xattrs require the user. namespace prefix
+    os.setxattr(path_str, b"user.com.dropbox.ignored", b"1")
+
+
+_IGNORE_FNS = {"Windows": _ignore_windows, "Darwin": _ignore_darwin, "Linux": _ignore_linux}
+
+
+def ignore_directory(path, system=_SYSTEM):
+    """Set the appropriate attribute based on OS
+
+    Writes the com.dropbox.ignored marker in-process (setxattr on
+    Linux/macOS, the NTFS alternate data stream on Windows) — no
+    subprocess per directory. Returns False when the write fails.
+    """
+    fn = _IGNORE_FNS.get(system, _ignore_linux)
+    try:
+        fn(str(path))
+        return True
+    except OSError:
+        return False
@@ -1,96 +1,73 @@
 """Shared Rich help formatter and utilities for dropfix CLI tools"""
 import argparse
-import re
 import sys
-from importlib.metadata import version
 
 from rich.console import Console, Group
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
-
 console = Console()
 
 
 def show_version():
     """Display dropfix version in a Rich panel"""
+    # Imported here so its sys.path metadata walk is only paid on --version
+    from importlib.metadata import version
+
     version_text = f"[bold white]dropfix[/bold white] [dim]{version('dropfix')}[/dim]"
     console.print(Panel(version_text, border_style="green"))
     sys.exit(0)
 
 
 class RichHelpFormatter(argparse.RawDescriptionHelpFormatter):
-    """Custom formatter that uses Rich for help output"""
+    """Custom formatter that uses Rich for help output
+
+    Instead of rendering argparse's plain-text help and re-parsing it line
+    by line, the formatter captures the structured data argparse already
+    has — the usage string, the description, and each option's invocation
+    and help text — as argparse feeds it in, then lays it out with Rich.
+    """
 
     def __init__(self, *args, title="Help", **kwargs):
         super().__init__(*args, **kwargs)
         self.title = title
+        self._rich_usage = None
+        self._rich_description = None
+        self._rich_options = []
+
+    def add_usage(self, usage, actions, groups, prefix=None):
+        self._rich_usage = self._format_usage(usage, actions, groups, prefix).strip()
+
+    def add_text(self, text):
+        if text and self._rich_description is None:
+            self._rich_description = text
+
+    def add_arguments(self, actions):
+        for action in actions:
+            if action.option_strings:
+                self._rich_options.append(
+                    (self._format_action_invocation(action), action.help or "")
+                )
 
     def format_help(self):
-        help_text = super().format_help()
-        lines = help_text.split('\n')
-
-        # Extract usage and description
-        usage_line = ""
-        description = ""
-        options = []
-
-        in_options = False
-        current_option = None
-
-        for line in lines:
-            if line.startswith('usage:'):
-                usage_line = line
-            elif line.strip() and not line.startswith(' ') and not line.startswith('-') and 'options:' not in line.lower():
-                description = line
-            elif 'options:' in line.lower():
-                in_options = True
-            elif in_options and line.strip():
-                # Check if this is a new option (starts with whitespace + dash at beginning)
-                if re.match(r'^\s{1,4}-', line):
-                    # This is a new option flag
-                    # Try to parse as option line with description on same line
-                    # Pattern handles: -h, --help, --flag ARG, --flag {choice1,choice2}, -f, --flag
-                    match = re.match(r'(\s*-[^\s]+(?:\s+[^\s,]+)?(?:,\s+-[^\s]+(?:\s+[^\s,]+)?)?)\s{2,}(.+)', line)
-                    if match:
-                        # Flag with description on same line
-                        flag = match.group(1).strip()
-                        desc = match.group(2).strip()
-                        current_option = [flag, desc]
-                        options.append(current_option)
-                    else:
-                        # Option flag only, description on next line(s)
-                        # This handles flags with arguments or choices like: --dirs DIRS [DIRS ...] or --show {all,ignored,not-ignored}
-                        match = re.match(r'^\s{1,4}(-[^\s]+(?:\s+[^\s]+)*)', line)
-                        if match:
-                            flag = match.group(1).strip()
-                            current_option = [flag, ""]
-                            options.append(current_option)
-                elif current_option and re.match(r'^\s{20,}', line):
-                    # Continuation line (heavily indented)
-                    if current_option[1]:
-                        current_option[1] += " " + line.strip()
-                    else:
-                        current_option[1] = line.strip()
-
-        # Parse usage line to bold "usage:" and dim the rest
-        usage_match = re.match(r'(usage:)(.+)', usage_line)
-        if usage_match:
+        # Style the usage line: bold "usage:" prefix, dim command synopsis
+        usage_line = self._rich_usage or ""
+        if usage_line.startswith("usage:"):
             usage_text = Text()
-            usage_text.append(usage_match.group(1), style="bold white")
-            usage_text.append(usage_match.group(2), style="dim")
+            usage_text.append("usage:", style="bold white")
+            usage_text.append(usage_line[len("usage:"):], style="dim")
         else:
             usage_text = Text(usage_line, style="white")
 
-        desc_text = Text(description, style="cyan")
+        desc_text = Text(self._rich_description or "", style="cyan")
 
         # Create table for options
         options_table = Table(show_header=False, box=None, padding=(0, 2), border_style=None)
         options_table.add_column("Flag", style="bright_green", no_wrap=True)
         options_table.add_column("Description", style="dim")
 
-        for flag, desc in options:
+        for flag, desc in self._rich_options:
             options_table.add_row(flag, desc)
 
         # Build layout
@@ -104,7 +81,7 @@ class RichHelpFormatter(argparse.RawDescriptionHelpFormatter):
         )
 
         # Only print if we have actual options (not being called during parser init)
-        if options:
+        if self._rich_options:
             console.print(Panel(help_group, title=f"[bold cyan]{self.title}[/bold cyan]", border_style="cyan"))
             sys.exit(0)
 
@@ -1,18 +1,16 @@
 #!/usr/bin/env python3
 import argparse
 import os
-import platform
-import shlex
-import subprocess
 import sys
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn
+from rich.progress import BarColumn, Progress, TextColumn, TimeRemainingColumn
 from rich.prompt import Confirm
 from rich.table import Table
 
+from dropfix._core import _SYSTEM, _scan_parallel, find_dropbox_path, ignore_directory
 from dropfix._formatter import RichHelpFormatter, show_version
 from dropfix._logger import logger, set_verbosity
 
@@ -44,7 +42,21 @@ def main():
         help="Directories to process (default: .venv .conda node_modules)",
     )
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without applying")
+    parser.add_argument(
+        "--exclude",
+        nargs="+",
+        default=[".git", ".svn", "__pycache__", ".cache", ".Trash"],
+        help="Directory names to skip descending into; target names are never skipped",
+    )
+    parser.add_argument(
+        "--no-prune-hidden",
+        action="store_true",
+        help="Also search inside hidden directories (slower)",
+    )
     parser.add_argument("--yes", "-y", action="store_true", help="Skip confirmation")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Scanner threads for the directory walk (default: auto)"
+    )
     parser.add_argument(
         "-v", "--verbose", action="count", default=0, help="Increase verbosity (use -v, -vv for more)"
     )
@@ -64,12 +76,26 @@ def main():
         default=[".venv", ".conda", "node_modules"],
         help="Directories to check (default: .venv .conda node_modules)",
     )
+    check_parser.add_argument(
+        "--exclude",
+        nargs="+",
+        default=[".git", ".svn", "__pycache__", ".cache", ".Trash"],
+        help="Directory names to skip descending into; target names are never skipped",
+    )
+    check_parser.add_argument(
+        "--no-prune-hidden",
+        action="store_true",
+        help="Also search inside hidden directories (slower)",
+    )
     check_parser.add_argument(
         "--show",
         choices=["all", "ignored", "not-ignored"],
         default="all",
         help="Filter results (default: all)",
     )
+    check_parser.add_argument(
+        "--workers", type=int, default=None, help="Scanner threads for the directory walk (default: auto)"
+    )
     check_parser.add_argument(
         "-v", "--verbose", action="count", default=0, help="Increase verbosity (use -v, -vv for more)"
     )
@@ -79,6 +105,9 @@ def main():
     # Set logging verbosity
     set_verbosity(args.verbose)
 
+    # Each CLI invocation re-detects the root; the cache only spans one run
+    find_dropbox_path.cache_clear()
+
     # Handle help and version
     if args.help:
         parser.print_help()
@@ -112,7 +141,14 @@ def main():
         console.print(Panel(table, title="[bold cyan]Check Configuration[/bold cyan]", border_style="cyan"))
 
         # Check directories
-        check_directories(dropbox_path, args.dirs, args.show)
+        check_directories(
+            dropbox_path,
+            args.dirs,
+            args.show,
+            prune_hidden=not args.no_prune_hidden,
+            exclude=frozenset(args.exclude),
+            max_workers=args.workers,
+        )
         return 0
 
     # Default: ignore directories
@@ -148,90 +184,101 @@ def main():
             return 0
 
     # Find and ignore directories
-    process_directories(dropbox_path, args.dirs, dry_run=args.dry_run)
+    process_directories(
+        dropbox_path,
+        args.dirs,
+        dry_run=args.dry_run,
+        prune_hidden=not args.no_prune_hidden,
+        exclude=frozenset(args.exclude),
+        max_workers=args.workers,
+    )
     return 0
 
 
-def find_dropbox_path():
-    """Auto-detect Dropbox path based on common locations"""
-    home = Path.home()
-    common_paths = [home / "Dropbox", home / "Documents" / "Dropbox"]
-
-    # Windows-specific paths
-    if platform.system() == "Windows":
-        common_paths.extend([
-            Path(os.environ.get("USERPROFILE", "")) / "Dropbox",
-            Path(os.environ.get("HOMEDRIVE", "") + os.environ.get("HOMEPATH", "")) / "Dropbox",
-        ])
-
-    logger.debug(f"Searching for Dropbox in: {common_paths}")
-    for path in common_paths:
-        if path.exists() and path.is_dir():
-            logger.info(f"Found Dropbox at: {path}")
-            return path
-
-    logger.warning("Dropbox path not found in common locations")
-    return None
-
-
-def process_directories(dropbox_path, dir_names, dry_run=False):
+def process_directories(dropbox_path, dir_names, dry_run=False, prune_hidden=True, exclude=None, max_workers=None):
     """Find and process directories to ignore"""
-    system = platform.system()
     ignored_count = 0
     error_count = 0
 
-    logger.info(f"Processing directories: {dir_names}")
-    logger.debug(f"System: {system}, Dry run: {dry_run}")
+    # %-style args keep formatting lazy: the cost is only paid when the
+    # level is enabled, which matters in the per-directory loop below
+    logger.info("Processing directories: %s", dir_names)
+    logger.debug("System: %s, Dry run: %s", _SYSTEM, dry_run)
+
+    # One walk for all target names, streamed straight into the writers
+    console.print(f"\n[cyan]Searching for {', '.join(dir_names)} directories...[/cyan]")
+    logger.debug("Searching for %s in %s", dir_names, dropbox_path)
+    found_counts = {name: 0 for name in dir_names}
+    error_messages = []
+
+    with Progress(
+        TextColumn("[cyan]{task.description}[/cyan]"),
+        BarColumn(complete_style="green", finished_style="green"),
+        TextColumn("[white]{task.completed}/{task.total}[/white]"),
+        TimeRemainingColumn(),
+        console=console,
+        refresh_per_second=10,
+    ) as progress:
+        # total is unknown until the walk finishes; Rich shows a pulsing
+        # bar for total=None, then we pin it once all writes are queued
+        task = progress.add_task("Processing directories", total=None)
+
+        def process_one(dir_path):
+            """Ignore one directory; True on success, False otherwise"""
+            try:
+                logger.debug("Processing: %s", dir_path)
+                if dry_run:
+                    return True
+                if ignore_directory(dir_path):
+                    logger.debug("Successfully ignored: %s", dir_path)
+                    return True
+                logger.warning("Failed to ignore: %s", dir_path)
+                return False
+            except (PermissionError, OSError) as e:
+                logger.error("Error processing %s: %s", dir_path, e)
+                # Printing through a live Progress forces a re-render;
+                # collect the messages and emit them after the bar closes
+                error_messages.append(
+                    f"[red]Error {'simulating' if dry_run else 'ignoring'} {dir_path}: {e}[/red]"
+                )
+                return False
+
+        # Marker writes can stall on Dropbox's sync layer, so fan out and
+        # stream matches straight into the pool — writes overlap the walk
+        # instead of waiting for a full match list
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = []
+            for match in _scan_parallel(
+                dropbox_path, frozenset(dir_names), prune_hidden=prune_hidden, exclude=exclude, max_workers=max_workers
+            ):
+                found_counts[os.path.basename(match)] += 1
+                futures.append(executor.submit(process_one, match))
+            progress.update(task, total=len(futures))
+            # Advance the bar in chunks: each advance() call does locked
+            # bookkeeping, and at 10 Hz nobody sees sub-chunk granularity
+            pending_advance = 0
+            for future in as_completed(futures):
+                if future.result():
+                    ignored_count += 1
+                else:
+                    error_count += 1
+                pending_advance += 1
+                if pending_advance == 64:
+                    progress.advance(task, pending_advance)
+                    pending_advance = 0
+            if pending_advance:
+                progress.advance(task, pending_advance)
+
+    for message in error_messages:
+        console.print(message)
 
-    # Find all matching directories
     for dir_name in dir_names:
-        console.print(f"\n[cyan]Searching for '{dir_name}' directories...[/cyan]")
-        logger.debug(f"Searching for '{dir_name}' in {dropbox_path}")
-        matches = []
-
-        try:
-            # Use os.walk to avoid recursive glob limitations in some Python versions
-            for root, dirs, _ in os.walk(dropbox_path):
-                for d in dirs:
-                    if d == dir_name:
-                        matches.append(Path(root) / d)
-        except (PermissionError, OSError) as e:
-            logger.error(f"Error accessing directory during search: {e}")
-            console.print(f"[red]Error accessing directory: {e}[/red]")
-            continue
-
-        if not matches:
+        count = found_counts[dir_name]
+        if count:
+            console.print(f"[green]Found {count} '{dir_name}' directories[/green]")
+            logger.info("Found %d '%s' directories", count, dir_name)
+        else:
             console.print(f"[dim]No '{dir_name}' directories found[/dim]")
-            continue
-
-        console.print(f"[green]Found {len(matches)} '{dir_name}' directories[/green]")
-        logger.info(f"Found {len(matches)} '{dir_name}' directories")
-
-        # Process each directory
-        with Progress(
-            TextColumn("[cyan]{task.description}[/cyan]"),
-            BarColumn(complete_style="green", finished_style="green"),
-            TextColumn("[white]{task.completed}/{task.total}[/white]"),
-            TimeRemainingColumn(),
-            console=console,
-        ) as progress:
-            task = progress.add_task(f"Processing {dir_name}", total=len(matches))
-            for dir_path in matches:
-                try:
-                    logger.debug(f"Processing: {dir_path}")
-                    if dry_run:
-                        ignored_count += 1
-                    elif ignore_directory(dir_path, system):
-                        logger.debug(f"Successfully ignored: {dir_path}")
-                        ignored_count += 1
-                    else:
-                        logger.warning(f"Failed to ignore: {dir_path}")
-                        error_count += 1
-                except (PermissionError, OSError, subprocess.CalledProcessError) as e:
-                    logger.error(f"Error processing {dir_path}: {e}")
-                    console.print(f"[red]Error {'simulating' if dry_run else 'ignoring'} {dir_path}: {e}[/red]")
-                    error_count += 1
-                progress.advance(task)
 
     # Summary
     summary_table = Table(show_header=True, header_style="white", box=None)
@@ -251,42 +298,5 @@ def process_directories(dropbox_path, dir_names, dry_run=False):
         console.print("\n[dim]Note: You may need to restart Dropbox for changes to take effect.[/dim]")
 
 
-def ignore_directory(path, system):
-    """Set the appropriate attribute based on OS"""
-    try:
-        if system == "Windows":
-            # Windows: NTFS alternate data streams
-            # Use list arguments to avoid shell injection
-            subprocess.run(
-                [
-                    "powershell",
-                    "-Command",
-                    f"Set-Content -Path {shlex.quote(str(path))} -Stream com.dropbox.ignored -Value 1"
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        elif system == "Darwin":  # macOS
-            # macOS: extended attributes
-            subprocess.run(
-                ["xattr", "-w", "com.dropbox.ignored", "1", str(path)],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        else:  # Linux and others
-            # Linux: attributes
-            subprocess.run(
-                ["attr", "-s", "com.dropbox.ignored", "-V", "1", str(path)],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        return True
-    except subprocess.CalledProcessError:
-        return False
-
-
 if __name__ == "__main__":
     sys.exit(main())
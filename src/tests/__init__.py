@@ -1 +0,0 @@
-"""Tests for dropfix"""
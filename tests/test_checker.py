@@ -1,64 +1,83 @@
 """Tests for dropfix-check functionality"""
-import subprocess
+import errno
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import mock_open, patch
 
 import pytest
 
-from dropfix._checker import check_if_ignored, organize_directories
+from dropfix import _core
+from dropfix._checker import organize_directories
+from dropfix._core import _supports_ignore_marker, check_if_ignored
 
 
 class TestCheckIfIgnored:
     """Tests for check_if_ignored function"""
 
-    @patch("dropfix._checker.subprocess.run")
-    def test_macos_ignored(self, mock_run):
+    @patch("dropfix._core._darwin_getxattr")
+    def test_macos_ignored(self, mock_getxattr):
         """Should return True when directory is ignored on macOS"""
-        mock_run.return_value = Mock(returncode=0, stdout="1\n")
+        mock_getxattr.return_value = b"1\n"
         path = Path("/test/path")
 
         result = check_if_ignored(path, "Darwin")
 
         assert result is True
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "xattr"
-        assert call_args[1] == "-p"
-        assert call_args[2] == "com.dropbox.ignored"
-
-    @patch("dropfix._checker.subprocess.run")
-    def test_macos_not_ignored(self, mock_run):
-        """Should return False when directory is not ignored on macOS"""
-        mock_run.return_value = Mock(returncode=1, stdout="")
+        mock_getxattr.assert_called_once_with(str(path))
+
+    @patch("dropfix._core._darwin_getxattr")
+    def test_macos_not_ignored(self, mock_getxattr):
+        """Should return False when the attribute is absent on macOS"""
+        mock_getxattr.return_value = None
         path = Path("/test/path")
 
         result = check_if_ignored(path, "Darwin")
 
         assert result is False
 
-    @patch("dropfix._checker.subprocess.run")
-    def test_linux_ignored(self, mock_run):
+    @patch("dropfix._core.os.getxattr", create=True)
+    def test_linux_ignored(self, mock_getxattr):
         """Should return True when directory is ignored on Linux"""
-        mock_run.return_value = Mock(returncode=0, stdout="1")
+        mock_getxattr.return_value = b"1"
         path = Path("/test/path")
 
         result = check_if_ignored(path, "Linux")
 
         assert result is True
+        mock_getxattr.assert_called_once_with(str(path), b"user.com.dropbox.ignored")
+
+    @patch("dropfix._core.os.getxattr", create=True)
+    def test_linux_not_ignored(self, mock_getxattr):
+        """Should return False when the attribute is absent on Linux"""
+        mock_getxattr.side_effect = OSError(errno.ENODATA, "No data available")
+        path = Path("/test/path")
+
+        result = check_if_ignored(path, "Linux")
+
+        assert result is False
 
-    @patch("dropfix._checker.subprocess.run")
-    def test_windows_ignored(self, mock_run):
-        """Should return True when directory is ignored on Windows"""
-        mock_run.return_value = Mock(returncode=0, stdout="1")
+    @patch("builtins.open", mock_open(read_data=b"1"))
+    def test_windows_ignored(self):
+        """Should return True when the ADS marker exists on Windows"""
         path = Path("C:\\test\\path")
 
         result = check_if_ignored(path, "Windows")
 
         assert result is True
 
-    @patch("dropfix._checker.subprocess.run")
-    def test_error_returns_none(self, mock_run):
+    @patch("builtins.open")
+    def test_windows_not_ignored(self, mock_file):
+        """Should return False when the ADS marker is absent on Windows"""
+        mock_file.side_effect = FileNotFoundError("stream not found")
+        path = Path("C:\\test\\path")
+
+        result = check_if_ignored(path, "Windows")
+
+        assert result is False
+
+    @patch("dropfix._core._darwin_getxattr")
+    def test_error_returns_none(self, mock_getxattr):
         """Should return None when check fails"""
-        mock_run.side_effect = PermissionError("Access denied")
+        mock_getxattr.side_effect = PermissionError("Access denied")
         path = Path("/test/path")
 
         result = check_if_ignored(path, "Darwin")
@@ -66,6 +85,40 @@ class TestCheckIfIgnored:
         assert result is None
 
 
+class TestSupportsIgnoreMarker:
+    """Tests for the per-filesystem xattr support probe"""
+
+    @pytest.fixture(autouse=True)
+    def clear_probe_cache(self):
+        """Support is cached per st_dev for the process lifetime"""
+        _core._XATTR_SUPPORT.clear()
+        yield
+        _core._XATTR_SUPPORT.clear()
+
+    @patch("dropfix._core.os.getxattr", create=True)
+    def test_enotsup_marks_filesystem_unsupported(self, mock_getxattr, tmp_path):
+        """Should report unsupported when the filesystem rejects xattrs"""
+        mock_getxattr.side_effect = OSError(errno.ENOTSUP, "Operation not supported")
+
+        assert _supports_ignore_marker(tmp_path, "Linux") is False
+
+    @patch("dropfix._core.os.getxattr", create=True)
+    def test_missing_attribute_means_supported(self, mock_getxattr, tmp_path):
+        """An absent marker still proves the filesystem supports xattrs"""
+        mock_getxattr.side_effect = OSError(errno.ENODATA, "No data available")
+
+        assert _supports_ignore_marker(tmp_path, "Linux") is True
+
+    @patch("dropfix._core.os.getxattr", create=True)
+    def test_probe_is_cached_per_device(self, mock_getxattr, tmp_path):
+        """Should only probe each filesystem once"""
+        mock_getxattr.side_effect = OSError(errno.ENOTSUP, "Operation not supported")
+
+        assert _supports_ignore_marker(tmp_path, "Linux") is False
+        assert _supports_ignore_marker(tmp_path, "Linux") is False
+        mock_getxattr.assert_called_once()
+
+
 class TestOrganizeDirectories:
     """Tests for organize_directories function"""
 
@@ -105,6 +158,19 @@ class TestOrganizeDirectories:
         assert nested_counts[path1] == 0
         assert nested_counts[path2] == 0
 
+    def test_sibling_with_prefix_name(self, tmp_path):
+        """Should not treat a sibling whose name shares a prefix as nested"""
+        parent = tmp_path / "a"
+        sibling = tmp_path / "a-b"
+        child = tmp_path / "a" / "c"
+        paths = [parent, sibling, child]
+
+        top_level, nested_counts = organize_directories(paths, tmp_path)
+
+        assert sorted(top_level) == [parent, sibling]
+        assert nested_counts[parent] == 1
+        assert nested_counts[sibling] == 0
+
     def test_deeply_nested(self, tmp_path):
         """Should handle deeply nested structures"""
         parent = tmp_path / ".venv"
@@ -1,17 +1,23 @@
 """Tests for dropfix core functionality"""
-import os
-import subprocess
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import mock_open, patch
 
 import pytest
 
+from dropfix._core import _scan, _scan_parallel
 from dropfix.dropfix import find_dropbox_path, ignore_directory, process_directories
 
 
 class TestFindDropboxPath:
     """Tests for Dropbox path auto-detection"""
 
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """find_dropbox_path caches its result for the process lifetime"""
+        find_dropbox_path.cache_clear()
+        yield
+        find_dropbox_path.cache_clear()
+
     def test_finds_dropbox_in_home(self, tmp_path, monkeypatch):
         """Should find Dropbox in home directory"""
         dropbox_dir = tmp_path / "Dropbox"
@@ -43,83 +49,171 @@ class TestFindDropboxPath:
 class TestIgnoreDirectory:
     """Tests for ignore_directory function"""
 
-    @patch("dropfix.dropfix.subprocess.run")
-    def test_macos_success(self, mock_run):
+    @patch("dropfix._core._darwin_setxattr")
+    def test_macos_success(self, mock_setxattr):
         """Should successfully ignore directory on macOS"""
-        mock_run.return_value = Mock(returncode=0)
         path = Path("/test/path")
 
         result = ignore_directory(path, "Darwin")
 
         assert result is True
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "xattr"
-        assert call_args[1] == "-w"
-        assert call_args[2] == "com.dropbox.ignored"
-
-    @patch("dropfix.dropfix.subprocess.run")
-    def test_macos_failure(self, mock_run):
-        """Should return False when xattr command fails"""
-        mock_run.side_effect = subprocess.CalledProcessError(1, "xattr")
+        mock_setxattr.assert_called_once_with(str(path))
+
+    @patch("dropfix._core._darwin_setxattr")
+    def test_macos_failure(self, mock_setxattr):
+        """Should return False when the xattr write fails"""
+        mock_setxattr.side_effect = OSError(1, "Operation not permitted")
         path = Path("/test/path")
 
         result = ignore_directory(path, "Darwin")
 
         assert result is False
 
-    @patch("dropfix.dropfix.subprocess.run")
-    def test_linux_success(self, mock_run):
+    @patch("dropfix._core.os.setxattr", create=True)
+    def test_linux_success(self, mock_setxattr):
         """Should successfully ignore directory on Linux"""
-        mock_run.return_value = Mock(returncode=0)
         path = Path("/test/path")
 
         result = ignore_directory(path, "Linux")
 
         assert result is True
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "attr"
-        assert call_args[1] == "-s"
-        assert call_args[2] == "com.dropbox.ignored"
-
-    @patch("dropfix.dropfix.subprocess.run")
-    def test_windows_success(self, mock_run):
-        """Should successfully ignore directory on Windows"""
-        mock_run.return_value = Mock(returncode=0)
+        mock_setxattr.assert_called_once_with(str(path), b"user.com.dropbox.ignored", b"1")
+
+    @patch("builtins.open", new_callable=mock_open)
+    def test_windows_success(self, mock_file):
+        """Should write the ADS marker directly on Windows"""
         path = Path("C:\\test\\path")
 
         result = ignore_directory(path, "Windows")
 
         assert result is True
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "powershell"
-        assert "Set-Content" in call_args[2]
+        mock_file.assert_called_once_with(f"{path}:com.dropbox.ignored", "wb")
+        mock_file().write.assert_called_once_with(b"1")
+
+
+class TestScan:
+    """Tests for the single-pass _scan traversal"""
+
+    def test_finds_all_target_names_in_one_pass(self, tmp_path):
+        """Should match every target name during a single traversal"""
+        (tmp_path / ".venv").mkdir()
+        (tmp_path / "project").mkdir()
+        (tmp_path / "project" / ".conda").mkdir()
+        (tmp_path / "project" / "node_modules").mkdir()
+
+        matches = sorted(_scan(tmp_path, frozenset([".venv", ".conda", "node_modules"])))
+
+        assert matches == [
+            str(tmp_path / ".venv"),
+            str(tmp_path / "project" / ".conda"),
+            str(tmp_path / "project" / "node_modules"),
+        ]
+
+    def test_does_not_descend_into_matches(self, tmp_path):
+        """Should not report targets nested inside a matched directory"""
+        nm = tmp_path / "node_modules"
+        nm.mkdir()
+        (nm / "pkg").mkdir()
+        (nm / "pkg" / ".venv").mkdir()
+
+        matches = list(_scan(tmp_path, frozenset([".venv", "node_modules"])))
+
+        assert matches == [str(nm)]
+
+    def test_prunes_hidden_directories(self, tmp_path):
+        """Should skip descent into non-target hidden directories by default"""
+        hidden_dir = tmp_path / ".hidden"
+        hidden_dir.mkdir()
+        (hidden_dir / "node_modules").mkdir()
+
+        assert list(_scan(tmp_path, frozenset(["node_modules"]))) == []
+        assert list(_scan(tmp_path, frozenset(["node_modules"]), prune_hidden=False)) == [
+            str(hidden_dir / "node_modules")
+        ]
+
+    def test_ignores_files_with_target_names(self, tmp_path):
+        """Should only match directories, not files"""
+        (tmp_path / ".venv").write_text("not a directory")
+
+        matches = list(_scan(tmp_path, frozenset([".venv"])))
+
+        assert matches == []
+
+    def test_excluded_directories_are_not_descended(self, tmp_path):
+        """Should skip descent into excluded directory names by default"""
+        pycache = tmp_path / "__pycache__"
+        pycache.mkdir()
+        (pycache / "node_modules").mkdir()
+
+        assert list(_scan(tmp_path, frozenset(["node_modules"]))) == []
+        assert list(_scan(tmp_path, frozenset(["node_modules"]), exclude=frozenset())) == [
+            str(pycache / "node_modules")
+        ]
+
+    def test_target_names_are_never_excluded(self, tmp_path):
+        """A name in both targets and exclude should still be matched"""
+        (tmp_path / ".git").mkdir()
+
+        matches = list(_scan(tmp_path, frozenset([".git"]), prune_hidden=False))
+
+        assert matches == [str(tmp_path / ".git")]
+
+    @patch("dropfix._core.os.scandir")
+    def test_survives_error_during_listing(self, mock_scandir, tmp_path):
+        """An OSError raised mid-listing should not abort or hang the walk"""
+        mock_scandir.return_value.__enter__.return_value.__iter__.side_effect = OSError(
+            "Stale file handle"
+        )
+
+        assert list(_scan(tmp_path, frozenset([".venv"]))) == []
+        # The parallel walker must still terminate: a worker that dies
+        # without bookkeeping would leave the generator blocked forever
+        assert list(_scan_parallel(tmp_path, frozenset([".venv"]), max_workers=2)) == []
+
+    def test_parallel_scan_matches_serial(self, tmp_path):
+        """Parallel walker should find the same matches as the serial one"""
+        (tmp_path / ".venv").mkdir()
+        (tmp_path / "a" / "b").mkdir(parents=True)
+        (tmp_path / "a" / "b" / "node_modules").mkdir()
+        (tmp_path / "a" / ".conda").mkdir()
+        targets = frozenset([".venv", ".conda", "node_modules"])
+
+        serial = sorted(_scan(tmp_path, targets))
+        parallel = sorted(_scan_parallel(tmp_path, targets, max_workers=4))
+
+        assert parallel == serial
+
+    def test_worker_count_is_clamped(self, tmp_path):
+        """max_workers below one should not hang the parallel walker"""
+        (tmp_path / ".venv").mkdir()
+
+        matches = list(_scan_parallel(tmp_path, frozenset([".venv"]), max_workers=0))
+
+        assert matches == [str(tmp_path / ".venv")]
 
 
 class TestProcessDirectories:
     """Tests for process_directories function"""
 
     @patch("dropfix.dropfix.ignore_directory")
-    @patch("dropfix.dropfix.os.walk")
-    def test_dry_run_mode(self, mock_walk, mock_ignore, tmp_path):
+    @patch("dropfix.dropfix._scan_parallel")
+    def test_dry_run_mode(self, mock_scan, mock_ignore, tmp_path):
         """Should not call ignore_directory in dry-run mode"""
-        venv_dir = tmp_path / ".venv"
-        mock_walk.return_value = [(str(tmp_path), [".venv"], [])]
+        mock_scan.return_value = iter([str(tmp_path / ".venv")])
 
         process_directories(tmp_path, [".venv"], dry_run=True)
 
         mock_ignore.assert_not_called()
 
     @patch("dropfix.dropfix.ignore_directory")
-    @patch("dropfix.dropfix.os.walk")
-    def test_processes_multiple_directories(self, mock_walk, mock_ignore, tmp_path):
+    @patch("dropfix.dropfix._scan_parallel")
+    def test_processes_multiple_directories(self, mock_scan, mock_ignore, tmp_path):
         """Should process all matching directories"""
-        mock_walk.return_value = [
-            (str(tmp_path), [".venv", ".conda"], []),
-            (str(tmp_path / "project"), [".venv"], []),
-        ]
+        mock_scan.return_value = iter([
+            str(tmp_path / ".venv"),
+            str(tmp_path / ".conda"),
+            str(tmp_path / "project" / ".venv"),
+        ])
         mock_ignore.return_value = True
 
         process_directories(tmp_path, [".venv", ".conda"], dry_run=False)
@@ -128,10 +222,10 @@ class TestProcessDirectories:
         assert mock_ignore.call_count == 3
 
     @patch("dropfix.dropfix.ignore_directory")
-    @patch("dropfix.dropfix.os.walk")
-    def test_handles_permission_errors(self, mock_walk, mock_ignore, tmp_path):
+    @patch("dropfix._core.os.scandir")
+    def test_handles_permission_errors(self, mock_scandir, mock_ignore, tmp_path):
         """Should continue processing after permission errors"""
-        mock_walk.side_effect = PermissionError("Access denied")
+        mock_scandir.side_effect = PermissionError("Access denied")
 
         # Should not raise exception
         process_directories(tmp_path, [".venv"], dry_run=False)